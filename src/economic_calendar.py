@@ -1,172 +1,262 @@
-import bs4
-import iso8601
-import numpy as np
+import logging
+import random
+import re
+import time
+
 import pandas as pd
-import pytz
+from lxml import html
 import requests
+from requests.adapters import HTTPAdapter, Retry
 import google_calendar as gcal
 import os
 
 # Constants
 URL = "https://tradingeconomics.com/united-states/calendar"
 HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
+    "Accept-Encoding": "gzip, deflate, br",
 }
 CSV_FILE = "./resources/economic-calendar-events.csv"
 
+# importance level encoded in the time cell's span class
+# Changed 10/23/24: class moved from first to second slot
+LEVEL_RE = re.compile(r"calendar-date-(\d+)")
+
+logger = logging.getLogger(__name__)
+
+# one session: keep-alive across requests, retries with backoff
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+        )
+    ),
+)
+
 
 # Functions
-def scrape_website(url, headers):
-    response = requests.get(url, headers=headers)
-    soup = bs4.BeautifulSoup(response.text, features="html.parser")
-    return soup.find("table", id="calendar")
+def scrape_website(url):
+    response = SESSION.get(url, timeout=(5, 30))
+    # lxml element tree; C-level traversal instead of bs4 Python objects
+    tree = html.fromstring(response.content)
+    return tree.get_element_by_id("calendar")
 
 
 def parse_row(row, date):
-    time = row.find("td").text.strip()
-    # level = row.find('td').span['class'][0] if row.find('td').span else ""
+    tds = row.findall("td")
+    time = tds[0].text_content().strip()
     level = '0'
-    try:
-        if row.find("td").span["class"]:
-            # Changed 10/23/24
-            # index changed from 0 -> 1
-            level = row.find("td").span["class"][1]
-    except IndexError:
-        level = '0'
-    country = row.find("td").find_next_sibling().text.strip()
-    description = (
-        row.find("td").find_next_sibling().find_next_sibling().text.strip()
-    )
-    return [date, time, country, level, description]
+    span = tds[0].find("span")
+    if span is not None:
+        match = LEVEL_RE.search(span.get("class") or "")
+        if match:
+            level = match.group(1)
+    country = tds[1].text_content().strip()
+    description = tds[2].text_content().strip()
+    # empty cells become None so no full-frame replace is needed later
+    return [
+        date or None,
+        time or None,
+        country or None,
+        level or None,
+        description or None,
+    ]
 
 
-def convert_to_utc(date_str):
-    return iso8601.parse_date(date_str).astimezone(pytz.utc)
+def main():
+    # Scraping and Parsing
+    table = scrape_website(URL)
+    data = []
+    date = ""
 
+    for row in table.iterchildren("thead", "tr"):
+        row_class = row.get("class")
+        if row_class is None:
+            data.append(parse_row(row, date))
+        elif row_class.split() == ["table-header"]:
+            date = row.find(".//th").text_content().strip()
 
-# Scraping and Parsing
-soup = scrape_website(URL, HEADERS)
-data = []
-date = ""
+    # Data Transformation
+    # hand pandas columns, not rows, so it skips row-wise inference
+    columns = ["date", "time", "country", "level", "summary"]
+    df = pd.DataFrame(dict(zip(columns, zip(*data))), columns=columns)
 
-for row in soup.find_all(["thead", "tr"], recursive=False):
-    try:
-        if row["class"] == ["table-header"]:
-            date = row.th.text.strip()
-    except KeyError:
-        data.append(parse_row(row, date))
+    # parse_row already reduced the class to its digit via LEVEL_RE
+    df["level"] = (
+        pd.to_numeric(df["level"], errors="coerce").fillna(0).astype("int8")
+    )
+    # explicit format + cache: one strptime per unique date string
+    dt_ser = pd.to_datetime(df["date"], format="%A %B %d %Y", cache=True)
+    df["dateYear"] = dt_ser.dt.year
+    df["dateMonth"] = dt_ser.dt.month
+    df["dateDay"] = dt_ser.dt.day
 
-# Data Transformation
-df = pd.DataFrame(
-    data, columns=["date", "time", "country", "level", "summary"]
-)
+    # 12h -> 24h in one parse; rows that aren't AM/PM times keep their raw value
+    parsed_time = pd.to_datetime(
+        df["time"], format="%I:%M %p", errors="coerce", cache=True
+    )
+    df["miltime"] = parsed_time.dt.strftime("%H:%M").where(
+        parsed_time.notna(), df["time"]
+    )
 
-df["level"] = df.level.str.split("calendar-date-").str[-1].astype(int)
-df["dateYear"] = pd.to_datetime(df["date"]).dt.strftime("%Y").astype(int)
-df["dateMonth"] = pd.to_datetime(df["date"]).dt.strftime("%m").astype(int)
-df["dateDay"] = pd.to_datetime(df["date"]).dt.strftime("%d").astype(int)
+    df["dateAdded"] = pd.Timestamp("now")
 
-df["miltime"] = df.time
-maskAMPM = df["miltime"].str.contains("AM|PM")
-df.loc[maskAMPM, "miltime"] = df.miltime.str.replace(" ", ":00 ")
-df.loc[maskAMPM, "miltime"] = pd.to_datetime(df["miltime"], format="mixed").dt.strftime("%H:%M")
+    # narrow dtypes so the merges hash small keys instead of int64/object
+    df = df.astype(
+        {
+            "country": "category",
+            "dateYear": "int16",
+            "dateMonth": "int8",
+            "dateDay": "int8",
+        }
+    )
 
-df["dateAdded"] = pd.Timestamp("now")
-df.replace("", np.nan, inplace=True)
+    # drop in-scrape duplicates before the diff so they never hit the file
+    df = df.drop_duplicates(subset=["date", "time", "summary"])
 
-# CSV Operations
-df_csv = pd.read_csv(CSV_FILE).drop_duplicates()
+    # CSV Operations
+    df_csv = pd.read_csv(CSV_FILE).drop_duplicates()
 
-# isolate scraped records, not currently in csv
-df_merge = df.merge(df_csv, on=["date", "time", "summary"], how="left")
-df_merge = df.merge(
-    df_merge.query("dateAdded_y.isnull()"),
-    on=["date", "time", "summary"],
-    how="inner",
-)
-df_merge = df_merge[df.columns]
-if df_merge.empty: print("No new events. CSV file is up to date.")
-else:
-    # write to csv file
-    df_csv_new = pd.concat([df_csv, df_merge], ignore_index=True)
-    df_csv_new.to_csv(CSV_FILE, index=False)
-
-    # Query Google Calendar
-    retries = 0
-    max_retries = 1
-    success = False
-    newlist = []
-    while retries <= max_retries and not success:
-        try:
-            gcal.main()
-            eventlist = gcal.getEventList()
-
-            for event in eventlist:
-                summary = event["summary"]
-                date = event["start"]["dateTime"]
-                # print(date +" " + summary)
-                newlist.append([date, summary])
-            
-            # Transform Calendar events to merge with CSV contents
-            df_calendar = pd.DataFrame(
-                newlist, columns=["date", "summary"]
-            ).drop_duplicates()
-            df_calendar["newdate"] = df_calendar["date"].apply(convert_to_utc)
-            df_calendar[["dateYear", "dateMonth", "dateDay"]] = (
-                df_calendar["newdate"].dt.strftime("%Y-%m-%d").str.split("-", expand=True)
-            )
-            df_calendar[["dateYear", "dateMonth", "dateDay"]] = df_calendar[
-                ["dateYear", "dateMonth", "dateDay"]
-            ].astype(int)
-            df_calendar["incal"] = "yes"
-
-            # Filter specific events
-            query_string = 'level==3 or summary.str.contains("Initial jobless claims") or summary.str.contains("GDP Growth Rate") or summary.str.contains("CPI") or summary.str.contains("Core PCE Price Index MoM") or summary.str.contains("New Home Sales MoM")'
-            df_merge_3 = df_csv_new.query(query_string, engine="python")
-            merge4 = df_merge_3.merge(
-                df_calendar, on=["dateYear", "dateMonth", "dateDay", "summary"], how="left"
-            )
-            events_not_in_calendar = merge4.query("incal.isnull()")[
-                [
-                    "date_x",
-                    "level",
-                    "summary",
-                    "dateYear",
-                    "dateMonth",
-                    "dateDay",
-                    "miltime",
+    # isolate scraped records, not currently in csv
+    df_merge = df.merge(
+        df_csv[["date", "time", "summary"]].drop_duplicates(),
+        on=["date", "time", "summary"],
+        how="left",
+        indicator=True,
+    )
+    df_merge = df_merge.loc[df_merge["_merge"] == "left_only", df.columns]
+    if df_merge.empty:
+        logger.info("No new events. CSV file is up to date.")
+    else:
+        # append only the new rows instead of rewriting the whole history;
+        # keep the union in memory for the calendar sync below
+        df_merge.to_csv(CSV_FILE, mode="a", header=False, index=False)
+        df_csv_new = pd.concat([df_csv, df_merge], ignore_index=True)
+
+        # Query Google Calendar
+        retries = 0
+        max_retries = 1
+        success = False
+        while retries <= max_retries and not success:
+            try:
+                gcal.main()
+                eventlist = gcal.getEventList()
+
+                newlist = [
+                    [event["start"]["dateTime"], event["summary"]]
+                    for event in eventlist
+                ]
+
+                # Transform Calendar events to merge with CSV contents
+                df_calendar = pd.DataFrame(
+                    newlist, columns=["date", "summary"]
+                ).drop_duplicates()
+                df_calendar["newdate"] = pd.to_datetime(
+                    df_calendar["date"], utc=True, format="ISO8601"
+                )
+                df_calendar["eventDay"] = (
+                    df_calendar["newdate"].dt.tz_localize(None).dt.normalize()
+                )
+
+                # Filter specific events
+                summary_pattern = (
+                    "Initial jobless claims|GDP Growth Rate|CPI"
+                    "|Core PCE Price Index MoM|New Home Sales MoM"
+                )
+                event_mask = (df_csv_new["level"] == 3) | df_csv_new[
+                    "summary"
+                ].str.contains(summary_pattern, regex=True, na=False)
+                df_merge_3 = df_csv_new[event_mask]
+                # single datetime64 day key instead of a 3-int composite key
+                df_merge_3 = df_merge_3.assign(
+                    eventDay=pd.to_datetime(
+                        df_merge_3[["dateYear", "dateMonth", "dateDay"]].rename(
+                            columns={
+                                "dateYear": "year",
+                                "dateMonth": "month",
+                                "dateDay": "day",
+                            }
+                        )
+                    )
+                )
+                merge4 = df_merge_3.merge(
+                    df_calendar[["eventDay", "summary"]].drop_duplicates(),
+                    on=["eventDay", "summary"],
+                    how="left",
+                    indicator=True,
+                )
+                events_not_in_calendar = merge4.loc[
+                    merge4["_merge"] == "left_only",
+                    [
+                        "date",
+                        "level",
+                        "summary",
+                        "dateYear",
+                        "dateMonth",
+                        "dateDay",
+                        "miltime",
+                    ],
                 ]
-            ]
-
-            # Insert Events to Calendar
-            gcal.insertEventFromDict(events_not_in_calendar.to_dict("records"))
-
-            print("\nEvents Scraped:\t", df["date"].count())
-            print("Events in CSV (before):\t", df_csv["date"].count())
-            print("Events in CSV (after):\t", df_csv_new["date"].count())
-            print("Events in CSV (diff):\t", df_merge["date"].count())
-            print("Events in calendar:\t", df_calendar["date"].count())
-            print("Events in CSV (after)(filtered):\t", df_merge_3["date"].count())
-            print(
-                "Events in CSV (after)(filtered) added to calendar:\t",
-                events_not_in_calendar["dateDay"].count(),
-            )
+
+                # Insert Events to Calendar
+                gcal.insertEventFromDict(events_not_in_calendar.to_dict("records"))
+
+                logger.info("Events Scraped:\t%s", df["date"].count())
+                logger.info(
+                    "Events in CSV (before):\t%s", df_csv["date"].count()
+                )
+                logger.info(
+                    "Events in CSV (after):\t%s", df_csv_new["date"].count()
+                )
+                logger.info(
+                    "Events in CSV (diff):\t%s", df_merge["date"].count()
+                )
+                logger.info(
+                    "Events in calendar:\t%s", df_calendar["date"].count()
+                )
+                logger.info(
+                    "Events in CSV (after)(filtered):\t%s",
+                    df_merge_3["date"].count(),
+                )
+                logger.info(
+                    "Events in CSV (after)(filtered) added to calendar:\t%s",
+                    events_not_in_calendar["dateDay"].count(),
+                )
             
-            success = True
-
-        except Exception as e:
-            print("Error occurred with Google Calendar:", e)
-
-            # delete current oauth file and retry
-            try: 
-                os.remove("./resources/oauth-token.json")
-                print("old oauth file has been deleted.")
-            except FileNotFoundError:
-                print("old oauth file was not found.")
-            except Exception as delete_error:
-                print(f"Error occured while trying to delete old oauth file: {delete_error}")
+                success = True
+
+            except Exception as e:
+                logger.error("Error occurred with Google Calendar: %s", e)
+
+                # delete current oauth file and retry
+                try: 
+                    os.remove("./resources/oauth-token.json")
+                    logger.info("old oauth file has been deleted.")
+                except FileNotFoundError:
+                    logger.info("old oauth file was not found.")
+                except Exception as delete_error:
+                    logger.error(
+                        "Error occured while trying to delete old oauth file: %s",
+                        delete_error,
+                    )
             
-            retries += 1
-            if retries > max_retries:
-                print(f"Exceeded maximum retry limit of {max_retries}. Aborting.")
+                retries += 1
+                if retries > max_retries:
+                    logger.error(
+                        "Exceeded maximum retry limit of %s. Aborting.",
+                        max_retries,
+                    )
+                else:
+                    # exponential backoff with jitter so retries don't
+                    # hammer the API at a fixed interval
+                    time.sleep(random.uniform(0, 2 ** retries))
+
 
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main()
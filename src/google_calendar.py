@@ -1,4 +1,4 @@
-import datetime
+import logging
 import os.path
 
 from google.auth.transport.requests import Request
@@ -11,6 +11,8 @@ from googleapiclient.errors import HttpError
 SCOPES = ["https://www.googleapis.com/auth/calendar.events"]
 CALENDAR_ID = "a2f405442fb6c4687738183931cbe0fa188d41fd0e60d0c021f544f51b639dc9@group.calendar.google.com"
 
+logger = logging.getLogger(__name__)
+
 def main():
     global creds
     creds = None
@@ -33,85 +35,100 @@ def main():
             token.write(creds.to_json())
     try:
         global service
-        service = build("calendar", "v3", credentials=creds)
+        # static_discovery: use the bundled discovery doc instead of
+        # fetching it from googleapis.com on every run
+        service = build(
+            "calendar", "v3", credentials=creds, static_discovery=True
+        )
     except HttpError as error:
-        print(f"An error occurred: {error}")
+        logger.error("An error occurred: %s", error)
 
 
 def getEventList():
     try:
-        service = build("calendar", "v3", credentials=creds)
-        events_result = (
-            service.events()
-            .list(
-                calendarId=CALENDAR_ID,
-                maxResults=99999,
-                singleEvents=True,
-                orderBy="startTime",
+        # The server caps a single response at 2500 items regardless of
+        # maxResults, so page through with pageToken. The fields mask trims
+        # the response to the two fields the sync actually reads.
+        events = []
+        page_token = None
+        while True:
+            events_result = (
+                service.events()
+                .list(
+                    calendarId=CALENDAR_ID,
+                    maxResults=250,
+                    singleEvents=True,
+                    orderBy="startTime",
+                    pageToken=page_token,
+                    fields="items(summary,start),nextPageToken",
+                )
+                .execute()
             )
-            .execute()
-        )
-        events = events_result.get("items", [])
+            events.extend(events_result.get("items", []))
+            page_token = events_result.get("nextPageToken")
+            if not page_token:
+                break
 
         if not events:
-            print("No upcoming events found.")
+            logger.info("No upcoming events found.")
             return
 
-        # Prints the start and name of the next 10 events
-        for event in events:
-            start = event["start"].get("dateTime", event["start"].get("date"))
-
         return events
     except HttpError as error:
-        print(f"An error occurred: {error}")
+        logger.error("An error occurred: %s", error)
+
+
+def _onInsert(request_id, response, exception):
+    if exception is not None:
+        logger.error("Insert failed for request %s: %s", request_id, exception)
+    else:
+        logger.info("Event created: %s", response.get("htmlLink"))
 
 
 def insertEventFromDict(events):
+    # Google's batch endpoint accepts at most 50 calls per request
+    BATCH_SIZE = 50
 
-    for event in events:
-        summary = event["summary"]
-        dateYear = int(event["dateYear"])
-        dateMonth = int(event["dateMonth"])
-        dateDay = int(event["dateDay"])
-        miltime = event["miltime"]
-        dateTimeString = (
-            str(dateYear)
-            + "-"
-            + str(dateMonth)
-            + "-"
-            + str(dateDay)
-            + "T"
-            + miltime
-        )
-        print(
-            "\n",
-            summary,
-            dateTimeString,
-            dateYear,
-            dateMonth,
-            dateDay,
-            miltime
-        )
-        event_template = {
-            "summary": summary,
-            "start": {
-                #'dateTime': '2023-10-19T16:00:00',
-                "dateTime": dateTimeString + ":00",
-                "timeZone": "Etc/UTC",
-            },
-            "end": {
-                #'dateTime': '2023-10-19T17:00:00',
-                "dateTime": dateTimeString + ":05",
-                "timeZone": "Etc/UTC",
-            },
-        }
-        event = (
-            service.events()
-            .insert(calendarId=CALENDAR_ID, body=event_template)
-            .execute()
-        )
-        print("Event created: %s" % (event.get("htmlLink")), '\n')
+    for start in range(0, len(events), BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=_onInsert)
+        for i, event in enumerate(events[start:start + BATCH_SIZE], start):
+            summary = event["summary"]
+            dateYear = int(event["dateYear"])
+            dateMonth = int(event["dateMonth"])
+            dateDay = int(event["dateDay"])
+            miltime = event["miltime"]
+            dateTimeString = f"{dateYear}-{dateMonth}-{dateDay}T{miltime}"
+            logger.debug(
+                "%s %s %s %s %s %s",
+                summary,
+                dateTimeString,
+                dateYear,
+                dateMonth,
+                dateDay,
+                miltime,
+            )
+            event_template = {
+                "summary": summary,
+                "start": {
+                    #'dateTime': '2023-10-19T16:00:00',
+                    "dateTime": dateTimeString + ":00",
+                    "timeZone": "Etc/UTC",
+                },
+                "end": {
+                    #'dateTime': '2023-10-19T17:00:00',
+                    "dateTime": dateTimeString + ":05",
+                    "timeZone": "Etc/UTC",
+                },
+            }
+            batch.add(
+                service.events().insert(
+                    calendarId=CALENDAR_ID, body=event_template
+                ),
+                request_id=str(i),
+            )
+        batch.execute()
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     main()